@@ -1,5 +1,5 @@
-from arcadepy import Arcade
-from supabase import Client, create_client, ClientOptions
+from arcadepy import AsyncArcade
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
 from livekit.plugins import (
     noise_cancellation,
     silero,
@@ -20,12 +20,19 @@ from livekit.agents import (
 from livekit import rtc
 from dotenv import load_dotenv
 import base64
-from typing import Annotated, Optional, Any
+import functools
+import hashlib
+from typing import Annotated, Optional, Any, Awaitable, Callable, Coroutine, TypedDict
 import logging
 import os
-from dateutil import parser
+import re
+import time
 import json
 import asyncio
+import contextvars
+import httpx
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
 try:
@@ -40,45 +47,227 @@ logger = logging.getLogger("Tetra")
 
 load_dotenv(".env.local")
 
+# Supabase settings, resolved once at import.
+# Repo convention: frontend uses NEXT_PUBLIC_SUPABASE_*.
+# Backend expects SUPABASE_* but we fall back for convenience.
+SUPABASE_URL = os.environ.get("SUPABASE_URL") or os.environ.get(
+    "NEXT_PUBLIC_SUPABASE_URL")
+SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY") or os.environ.get(
+    "NEXT_PUBLIC_SUPABASE_ANON_KEY")
+# Only needed for SIP callers (phone lookup bypasses RLS).
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+
+# Shared keep-alive connection pool for all outbound HTTP (Supabase PostgREST + Arcade) in this
+# worker process. Each session still gets its own Supabase `AsyncClient` (so the user's JWT stays
+# scoped to that client's headers), but every client sends requests through this one transport
+# instead of opening fresh TCP/TLS connections per session. HTTP/2 lets concurrent requests
+# (e.g. parallel tool calls in one LLM turn) multiplex over a single connection per host.
+# httpx drops idle connections after 5 s by default, which is shorter than the gap between tool
+# calls in a spoken conversation; keep them for a minute so the next call skips the TLS handshake.
+_HTTP_POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=32, max_connections=32, keepalive_expiry=60)
+_http_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+# Matches the Arcade SDK's own default (long-running tools, but fail fast on connect).
+_ARCADE_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# Supabase clients built on our own httpx client ignore supabase-py's `postgrest_client_timeout`
+# (120 s) and would otherwise get httpx's 5 s default for everything. 30 s covers slow RPCs
+# without leaving a voice turn hanging for minutes; connect still fails fast.
+_SUPABASE_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def _get_http_transport() -> httpx.AsyncHTTPTransport:
+    """Return the process-wide HTTP transport, creating it on first use."""
+    global _http_transport
+    if _http_transport is None:
+        _http_transport = httpx.AsyncHTTPTransport(
+            http2=True, limits=_HTTP_POOL_LIMITS)
+    return _http_transport
+
+
+async def _create_supabase_client(
+    url: str, key: str, user_token: Optional[str] = None
+) -> AsyncClient:
+    """
+    Create a Supabase client that shares the process-wide connection pool.
 
-class TetraAgent(Agent):
-    def __init__(self, room: rtc.Room, arcade_user_id: Optional[str] = None):
-        self.room = room
+    If `user_token` is given, requests are made as that user (RLS applies); otherwise the
+    client authenticates with `key` alone (anon or service role).
+    """
+    headers = {"Authorization": f"Bearer {user_token}"} if user_token else {}
+    return await acreate_client(
+        url,
+        key,
+        options=AsyncClientOptions(
+            headers=headers,
+            httpx_client=httpx.AsyncClient(
+                transport=_get_http_transport(), timeout=_SUPABASE_TIMEOUT),
+        ),
+    )
 
-        # 1. Identify User
-        user = next(iter(self.room.remote_participants.values()), None)
-        # These are hydrated in `on_enter`. In practice the agent can enter the room
-        # slightly before the user, so we also lazily hydrate them in tool calls.
-        self.user_id: Optional[str] = user.identity if user else None
-        self.user_timezone = ZoneInfo("America/New_York")  # Default to EST
 
-        # NOTE: `Agent` already exposes a read-only `.session` property internally.
-        # We keep our own reference for convenience without clobbering the base property.
-        self._session: Optional[AgentSession] = None
-        self.supabase: Optional[Client] = None
+# Clients that don't carry a user JWT (service role for SIP callers, anon fallback) are the same
+# for every session, so each is built once per worker process. Keyed by (url, api key).
+_shared_supabase_clients: dict[tuple[str, str], AsyncClient] = {}
+
+
+async def _get_shared_supabase_client(url: str, key: str) -> AsyncClient:
+    """Return the process-wide Supabase client for `key`, creating it on first use."""
+    client = _shared_supabase_clients.get((url, key))
+    if client is None:
+        client = await _create_supabase_client(url, key)
+        _shared_supabase_clients[(url, key)] = client
+    return client
+
+
+# How far past the requested day `get_day_context` looks for due tasks.
+_TASK_HORIZON_DAYS = 7
+
+# Upper bound on concurrent fire-and-forget tasks per agent (see `TetraAgent._spawn`).
+_MAX_BACKGROUND_TASKS = 32
+
+# Arcade Gmail tools whose results are cached per session (see `TetraAgent._call_arcade_tool`),
+# with how long (seconds) each result stays fresh, and how many results to keep. Message
+# bodies don't change and threads rarely gain replies mid-call; listings are only reused for
+# quick follow-ups ("what was the second one?") so new mail still shows up.
+_GMAIL_CACHE_TTLS = {
+    "Gmail.GetThread": 300,
+    "Gmail.GetMessage": 300,
+    "Gmail.ListEmails": 15,
+    "Gmail.ListEmailsByHeader": 15,
+}
+_GMAIL_CONTENT_CACHE_SIZE = 64
+
+# Most threads `get_email_threads` fetches per call.
+_MAX_THREADS_PER_CALL = 10
+
+# Tool results for `get_gmail_integration_state`, by state. The prefixes are what the
+# instructions' Gmail workflow branches on.
+_GMAIL_STATE_RESPONSES = {
+    "connected": (
+        "GMAIL_CONNECTED: Gmail is connected and ready. "
+        "You can now use list_emails, search_emails, get_email_thread, or get_email_threads."
+    ),
+    "snoozed": (
+        "GMAIL_SNOOZED: The user has snoozed Gmail integration. "
+        "Do NOT use Gmail tools. Tell them they can reconnect from the console when ready."
+    ),
+    "not_connected": (
+        "GMAIL_NOT_CONNECTED: Gmail is not connected. "
+        "Call prompt_gmail_connect to show the auth UI, then tell the user to click Connect."
+    ),
+    "unknown": (
+        "GMAIL_UNKNOWN: Could not determine Gmail status. "
+        "You may try Gmail tools - they will fail gracefully if not authorized."
+    ),
+}
+_GMAIL_TOOLS_UNAVAILABLE = (
+    "GMAIL_TOOLS_UNAVAILABLE: Gmail tools (list_emails, search_emails, etc.) are not configured. "
+    "This is a setup issue. Tell the user: 'Gmail tools are temporarily unavailable. "
+    "Try reconnecting or ask again in a moment.'"
+)
 
-        # Arcade SDK client for direct Gmail tool calls (bypasses MCP timing issues).
-        # This uses the same approach as read_gmail.py which works reliably.
-        arcade_api_key = os.environ.get("ARCADE_API_KEY")
-        self._arcade_client: Optional[Arcade] = Arcade(
-            api_key=arcade_api_key) if arcade_api_key else None
-        # Arcade user ID for OAuth token scoping (should match email used in console OAuth flow).
-        self._arcade_user_id: Optional[str] = arcade_user_id
+# Matches Arcade errors meaning the user hasn't (or no longer has) authorized Gmail.
+# "authoriz" also covers "not authorized", "authorization required", etc.
+_AUTH_ERR_RE = re.compile(r"authoriz", re.IGNORECASE)
 
-        # Cache Gmail integration state to avoid repeated DB calls within a conversation.
-        # Format: {"state": "connected"|"not_connected"|"snoozed", "checked_at": datetime}
-        self._gmail_state_cache: Optional[dict] = None
-        # How long to cache Gmail state (seconds). Short enough to pick up reconnects.
-        self._gmail_cache_ttl: int = 30
+# Envelope `type` values for `_broadcast_change` (the console matches on these exact strings).
+_CHANGE_TYPES = {"event": "event_update", "task": "task_update"}
+# No whitespace in data-channel payloads; the console only parses them.
+_COMPACT_JSON = (",", ":")
+
+
+def _json_default(obj: Any):
+    """`json.dumps` fallback for UUIDs, datetimes and other non-JSON types."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _fmt_hm(dt: datetime) -> str:
+    """Format `dt` as 24-hour `HH:MM` (same as `strftime("%H:%M")`, without the format parsing)."""
+    return f"{dt.hour:02d}:{dt.minute:02d}"
+
+
+# The clock is never part of the cached prompt prefix (it only appears in the greeting and tool
+# results, see `_INSTRUCTIONS`), so it can be exact to the minute without costing cache hits.
+@functools.lru_cache(maxsize=8)
+def _time_context(minute_bucket: int, tz_key: str) -> str:
+    """Render the current-time lines for the prompt. Cached per minute (`int(time.time() // 60)`)."""
+    now_local = datetime.fromtimestamp(minute_bucket * 60, ZoneInfo(tz_key))
+    return (
+        f"Current Time: {now_local.strftime('%I:%M %p')} ({tz_key})\n"
+        f"Current Date: {now_local.strftime('%A, %Y-%m-%d')}"
+    )
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Shorten `text` to at most `limit` characters for voice, marking the cut with '...'."""
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _tool_json(obj: Any) -> str:
+    """Serialize a structured tool result as compact JSON for the LLM."""
+    return json.dumps(obj, default=_json_default, separators=_COMPACT_JSON, ensure_ascii=False)
 
-        now_local = datetime.now(self.user_timezone)
 
-        super().__init__(
-            instructions=f"""\
+def _email_summary(email: dict) -> dict:
+    """Compact view of an Arcade Gmail message: only the fields the agent talks about."""
+    summary = {
+        "from": email.get("from") or email.get("sender") or "Unknown",
+        "subject": email.get("subject") or "(no subject)",
+        "date": email.get("date"),
+        # Enough of the preview to spot requests/deadlines (briefing protocol) without the body.
+        "snippet": _truncate(str(email.get("snippet") or ""), 160),
+        "thread_id": email.get("thread_id"),
+    }
+    return {k: v for k, v in summary.items() if v}
+
+
+def _thread_summary(thread: dict) -> dict:
+    """Voice-sized view of an Arcade Gmail thread: the first 3 messages, bodies truncated."""
+    messages = thread.get("messages") or []
+    return {
+        "message_count": len(messages),
+        "messages": [
+            {
+                "from": msg.get("from") or "Unknown",
+                "date": msg.get("date"),
+                "body": _truncate(str(msg.get("body") or msg.get("snippet") or ""), 200),
+            }
+            for msg in messages[:3]
+            if isinstance(msg, dict)
+        ],
+    }
+
+
+def _utc_iso_to_local_hm(value: str, offset_minutes: int) -> Optional[str]:
+    """
+    Fast path for `HH:MM` in local time straight from a UTC ISO timestamp string.
+
+    PostgREST returns timestamptz values in UTC (`...T14:30:00+00:00`), so the wall-clock time
+    is at a fixed position and only needs the zone offset added. Returns None if `value` is not
+    in that shape, so the caller can fall back to a full parse.
+    """
+    if len(value) < 16 or value[10] not in "T " or value[13] != ":":
+        return None
+    if not (value.endswith("+00:00") or value.endswith("Z")):
+        return None
+    try:
+        minutes = int(value[11:13]) * 60 + int(value[14:16]) + offset_minutes
+    except ValueError:
+        return None
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# Static system prompt. Kept byte-identical for the whole session and across sessions (no time/date
+# in it) so LLM providers with prompt-prefix caching can reuse it. The current time reaches the
+# model after the cached prefix instead: in the greeting and in tool results (`get_current_time`,
+# `get_day_context`).
+_INSTRUCTIONS = """\
 SYSTEM IDENTITY:
 You are TETRA, a proactive productivity coach.
-Current Time: {now_local.strftime("%I:%M %p")} ({self.user_timezone.key})
-Current Date: {now_local.strftime("%A, %Y-%m-%d")}
 
 Your goal is not just to manage the user's schedule, but to optimize their energy and sustainability. You bridge the gap between "I want to" and "I'm doing it" while ensuring the user doesn't burn out.
 
@@ -86,11 +275,12 @@ OPERATIONAL PARAMETERS
 - TONE: Casual, American, conversational, but authoritative on wellness (like a friendly personal trainer).
 - TIME FORMAT: 12-hour clock (2 pm). Only say for example "two p m", don't make it complicated (e.g. no need to include o'clock). Remember this is outputted as TTS so should be readable (so include spaces between 'a' and 'm')
 - DATE FORMAT: Natural/Relative.
+- CURRENT TIME: Not given up front. Call `get_current_time` before working out relative times or dates ("in 30 minutes", "tomorrow", "this Friday"); `get_day_context` results also start with it.
 
 CORE DIRECTIVES:
 
 1. SEMANTIC TRANSLATION & TOOL MAPPING:
-   - "Book/Schedule" -> `schedule_event`
+   - "Book/Schedule" -> `schedule_event` (several events at once, e.g. a proposed plan -> one `schedule_events_batch` call)
    - "Remind me/Task" -> `create_task`
    - "Change/Move/Reschedule" -> `update_event` or `update_task`
    - "Cancel/Delete" -> `delete_event` or `delete_task`
@@ -115,7 +305,7 @@ When the user asks about email (inbox, messages, Gmail, etc.):
 
 1. Call `get_gmail_integration_state` ONCE to check status.
 2. Based on the result:
-   - GMAIL_CONNECTED: Use `list_emails` (for recent mail), `search_emails` (to filter), or `get_email_thread` (for details).
+   - GMAIL_CONNECTED: Use `list_emails` (for recent mail), `search_emails` (to filter), or `get_email_thread` (for details; `get_email_threads` for several at once).
    - GMAIL_NOT_CONNECTED: Call `prompt_gmail_connect`, say "Click Connect in the bottom-right."
    - GMAIL_SNOOZED: Say "You've snoozed Gmail. Reconnect from the console when ready."
    - GMAIL_TOOLS_UNAVAILABLE: Say "Gmail tools are temporarily unavailable. Try again in a moment."
@@ -140,28 +330,143 @@ ROUTING:
 - "Briefing" -> Briefing Protocol (Hybrid)
 
 ERROR HANDLING:
-- If a tool fails, explain why briefly and offer a manual workaround or alternative time.""",
-        )
+- If a tool fails, explain why briefly and offer a manual workaround or alternative time."""
+
+
+class EventDraft(TypedDict):
+    """
+    One event for `schedule_events_batch` (same fields as `schedule_event`).
+
+    The LLM's strict tool schemas mark every key required, so the optional fields are
+    nullable (null = 60 minutes / no notes) rather than omittable.
+    """
+    title: str
+    start_iso: str
+    duration_minutes: Optional[int]
+    notes: Optional[str]
+
+
+@dataclass(slots=True)
+class _GmailState:
+    """A cached Gmail integration lookup."""
+    state: str  # "connected" | "not_connected" | "snoozed" | "unknown"
+    checked_at: float  # time.monotonic() of the lookup
+    # Snoozed entries only: when the snooze ends (unix seconds) and whether Gmail is connected
+    # underneath, so an expired snooze can be resolved without another lookup.
+    snooze_epoch: Optional[float] = None
+    connected: bool = False
+
+
+class TetraAgent(Agent):
+    def __init__(
+        self,
+        room: rtc.Room,
+        arcade_user_id: Optional[str] = None,
+        arcade_client: Optional[AsyncArcade] = None,
+    ):
+        self.room = room
+
+        # 1. Identify User
+        user = next(iter(self.room.remote_participants.values()), None)
+        # These are hydrated in `on_enter`. In practice the agent can enter the room
+        # slightly before the user, so we also lazily hydrate them in tool calls.
+        self.user_id: Optional[str] = user.identity if user else None
+        self.user_timezone = ZoneInfo("America/New_York")  # Default to EST
+
+        # NOTE: `Agent` already exposes a read-only `.session` property internally.
+        # We keep our own reference for convenience without clobbering the base property.
+        self._session: Optional[AgentSession] = None
+        self.supabase: Optional[AsyncClient] = None
+        # Set by `_ensure_user_and_supabase` when a SIP caller can't be matched to an account.
+        self._sip_error: Optional[str] = None
+
+        # Arcade SDK client for direct Gmail tool calls (bypasses MCP timing issues).
+        # This uses the same approach as read_gmail.py which works reliably.
+        # Built once per worker process in `prewarm` so its connections are already warm.
+        self._arcade_client: Optional[AsyncArcade] = arcade_client
+        # Arcade user ID for OAuth token scoping (should match email used in console OAuth flow).
+        self._arcade_user_id: Optional[str] = arcade_user_id
+        # User's email from their Supabase JWT, decoded once during hydration.
+        self._user_email: Optional[str] = None
+        # In-flight Arcade calls keyed by (tool_name, canonical input JSON) so overlapping
+        # identical calls share one request.
+        self._arcade_inflight: dict[tuple[str, str], asyncio.Future] = {}
+        # Recent Gmail results, keyed like `_arcade_inflight` and kept in LRU order. Only tools
+        # in `_GMAIL_CACHE_TTLS` are cached, each for its own TTL.
+        # Format: {(tool_name, input_json): (time.monotonic(), result)}
+        self._gmail_content_cache: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+
+        # Cache Gmail integration state to avoid repeated DB calls within a conversation.
+        self._gmail_state_cache: Optional[_GmailState] = None
+        # How long to cache Gmail state (seconds). Short enough to pick up reconnects.
+        self._gmail_cache_ttl: int = 30
+        # Serializes fresh lookups so concurrent tool calls share one DB round-trip.
+        self._gmail_state_lock = asyncio.Lock()
+
+        # Last publish time (time.monotonic()) per UI event name, so repeated nudges within
+        # `_ui_event_dedupe_window` seconds (e.g. the LLM re-calling prompt_gmail_connect in one
+        # turn) don't each send another data packet.
+        self._last_ui_event: dict[str, float] = {}
+        self._ui_event_dedupe_window: float = 2.0
+
+        # Supabase token parsed from each participant's metadata, keyed by participant sid.
+        # Format: {sid: (raw_metadata, token)} so a metadata change is detected and re-parsed.
+        self._metadata_token_cache: dict[str, tuple[str, str]] = {}
+
+        # Rendered `get_day_context` reports, keyed by (user_id, day). Any mutation made through
+        # this agent clears it; the TTL bounds staleness from edits made elsewhere (e.g. the console).
+        # Format: {(user_id, "YYYY-MM-DD"): (time.monotonic(), report)}
+        self._day_context_cache: dict[tuple[Optional[str], str], tuple[float, str]] = {}
+        self._day_context_ttl: int = 30
+        # Bumped by every invalidation. A fetch that started before a write must not store its
+        # (now stale) report, so it only caches if the version is unchanged when it finishes.
+        self._day_context_version: int = 0
+        # In-flight `get_day_context` RPCs keyed like the cache, so concurrent lookups of the same
+        # day share one round trip.
+        self._day_context_inflight: dict[tuple[Optional[str], str], asyncio.Future] = {}
+
+        # Strong references to fire-and-forget tasks (asyncio only keeps weak ones).
+        self._background_tasks: set[asyncio.Task] = set()
+
+        # Human (non-agent) participants currently in the room, keyed by identity and kept in
+        # sync by room events, so finding the user is a dict peek rather than a scan.
+        self._human_participants: dict[str, rtc.RemoteParticipant] = {}
+        # Set while a human participant is present, so hydration can wait on an event
+        # instead of polling `remote_participants`.
+        self._user_present = asyncio.Event()
+        # Optimistic writes still in flight (see `_write_in_background`). Kept apart from
+        # `_background_tasks` because these must finish, not be cancelled, when the session ends.
+        self._pending_writes: set[asyncio.Task] = set()
+
+        # Initial hydration started by `on_enter` (None until then).
+        self._hydration: Optional[asyncio.Future[bool]] = None
+
+        # JWT the per-user Supabase client currently sends (None for SIP/anon clients, which
+        # are shared and must never be re-authed).
+        self._supabase_user_token: Optional[str] = None
+
+        for p in self.room.remote_participants.values():
+            self._on_participant_connected(p)
+        self.room.on("participant_connected", self._on_participant_connected)
+        self.room.on("participant_disconnected",
+                     self._on_participant_disconnected)
+        self.room.on("participant_metadata_changed",
+                     lambda p, *_: self._refresh_user_token(p))
+        self.room.on("disconnected", lambda *_: self._cancel_background_tasks())
+
+        super().__init__(instructions=_INSTRUCTIONS)
 
     async def on_enter(self) -> None:
         """
-        LiveKit Agents calls `Agent.on_enter()` with **no arguments** in the version used
-        by this repo.
+        LiveKit Agents calls `Agent.on_enter()` with **no arguments** once the agent is active.
 
-        We still want access to the `AgentSession` object (to generate greetings, etc.).
-        The session is available via an internal contextvar set by LiveKit right before
-        calling `on_enter()`, so we read it from there.
+        The `AgentSession` (to generate greetings, etc.) is available via the public
+        `Agent.session` property at this point.
         """
-        # NOTE: This is an internal LiveKit context var, but it's the most reliable way
-        # to stay compatible with the installed `livekit-agents` behavior.
-        session: Optional[AgentSession] = None
         try:
-            from livekit.agents.voice import agent_activity as _aa  # type: ignore
-
-            # pyright: ignore[reportPrivateUsage]
-            data = _aa._OnEnterContextVar.get()
-            session = getattr(data, "session", None)
-        except Exception:
+            session: Optional[AgentSession] = self.session
+        except RuntimeError:
+            # Raised by the property if the agent isn't attached to a running session.
             session = None
 
         if session is None:
@@ -177,15 +482,27 @@ ERROR HANDLING:
         self._session = session
         logger.info("Agent joined room. Hydrating user session...")
 
+        # The greeting doesn't need the DB, so start it while we hydrate instead of leaving the
+        # user in silence. SIP callers are the exception: their account lookup can fail, and then
+        # the first thing they hear must be the error, not a greeting.
+        user = self._find_human_participant()
+        is_sip = user is not None and user.identity.startswith("sip_")
+        greeting = None if is_sip else asyncio.ensure_future(self.greet())
+
         # Hydrate Supabase/user context. IMPORTANT: the agent can join before the user;
         # if the user isn't present yet, we kick off a background "late hydrate" task
         # so DB-backed tools (including Gmail status) start working as soon as the user joins.
-        hydrated = await self._ensure_user_and_supabase(max_wait_seconds=10)
+        # Tools called while this is still running wait for it (see `_await_hydration`).
+        self._hydration = asyncio.ensure_future(
+            self._ensure_user_and_supabase(max_wait_seconds=10))
+        hydrated = await self._hydration
         if not hydrated:
             # Check if it was a specific SIP error
-            sip_error = getattr(self, "_sip_error", None)
+            sip_error = self._sip_error
             if sip_error:
                 logger.warning(f"SIP Authentication failed: {sip_error}")
+                if greeting is not None:
+                    await greeting
                 await self.session.generate_reply(
                     instructions=f"Inform the user: {sip_error}"
                 )
@@ -194,10 +511,31 @@ ERROR HANDLING:
             logger.warning(
                 "User not present yet (or missing metadata). Will hydrate DB context when user joins."
             )
-            asyncio.create_task(
-                self._ensure_user_and_supabase(max_wait_seconds=120))
+            self._spawn(self._ensure_user_and_supabase(max_wait_seconds=120),
+                        name="late_hydrate")
 
-        await self.greet()
+        await (greeting if greeting is not None else self.greet())
+
+    async def _await_hydration(self, timeout: float = 10) -> None:
+        """Let a tool call that races the initial hydration in `on_enter` wait for it instead of failing."""
+        hydration = self._hydration
+        if hydration is None or hydration.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(hydration), timeout)
+        except Exception:
+            # Hydration failures are logged by `_ensure_user_and_supabase`; the tool reports them.
+            pass
+
+    def _current_time_context(self) -> str:
+        return _time_context(int(time.time() // 60), self.user_timezone.key)
+
+    async def on_exit(self) -> None:
+        # Don't let a pending late-hydrate (up to 120 s) or broadcast outlive the session.
+        self._cancel_background_tasks()
+        # ...but do let already-confirmed writes land.
+        if self._pending_writes:
+            await asyncio.wait(self._pending_writes, timeout=5)
 
     async def _ensure_user_and_supabase(self, max_wait_seconds: int = 10) -> bool:
         """
@@ -209,33 +547,27 @@ ERROR HANDLING:
           tools would *permanently* fail for that session.
         - This helper can be called from `on_enter` and from individual tools to recover.
         """
-        if getattr(self, "supabase", None) and getattr(self, "user_id", None):
+        if self.supabase is not None and self.user_id:
             return True
 
-        if not getattr(self, "room", None):
+        if self.room is None:
             return False
 
         # Find the human user participant (non-agent) and extract their Supabase JWT from metadata.
-        user = None
-        attempts = max(1, int(max_wait_seconds / 0.2))
-        for _ in range(attempts):
-            for p in self.room.remote_participants.values():
-                if p.kind != rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
-                    user = p
-                    break
-            if user:
-                break
-            await asyncio.sleep(0.2)
+        # If they haven't joined yet, wait for the `participant_connected` hook instead of polling.
+        user = self._find_human_participant()
+        if user is None:
+            try:
+                await asyncio.wait_for(self._user_present.wait(), timeout=max_wait_seconds)
+            except asyncio.TimeoutError:
+                return False
+            user = self._find_human_participant()
 
         if not user:
             return False
 
-        # Repo convention: frontend uses NEXT_PUBLIC_SUPABASE_*.
-        # Backend expects SUPABASE_* but we fall back for convenience.
-        url = os.environ.get("SUPABASE_URL") or os.environ.get(
-            "NEXT_PUBLIC_SUPABASE_URL")
-        key = os.environ.get("SUPABASE_ANON_KEY") or os.environ.get(
-            "NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        url = SUPABASE_URL
+        key = SUPABASE_ANON_KEY
 
         if not url or not key:
             logger.error(
@@ -251,7 +583,7 @@ ERROR HANDLING:
 
             # We need the Service Role Key to look up the user by phone (bypassing RLS)
             # and to act as the user (admin rights) since we don't have their JWT.
-            service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+            service_key = SUPABASE_SERVICE_ROLE_KEY
             if not service_key:
                 logger.error(
                     "SIP user detected but SUPABASE_SERVICE_ROLE_KEY is missing.")
@@ -259,12 +591,11 @@ ERROR HANDLING:
                 return False
 
             try:
-                # Create admin client
-                # type: ignore
-                admin_client = create_client(url, service_key)
+                # Admin client (shared across SIP sessions in this process)
+                admin_client = await _get_shared_supabase_client(url, service_key)
 
                 # Look up user by phone
-                resp = admin_client.table("user_profiles").select(
+                resp = await admin_client.table("user_profiles").select(
                     "id").eq("phone_num", phone).single().execute()
 
                 if resp.data and isinstance(resp.data, dict):
@@ -286,13 +617,7 @@ ERROR HANDLING:
             self.user_id = user.identity
 
             # Parse token from participant metadata.
-            user_token = ""
-            try:
-                if user and user.metadata:
-                    data = json.loads(user.metadata)
-                    user_token = data.get("supabase_token") or ""
-            except Exception:
-                user_token = user.metadata if user else ""
+            user_token = self._participant_token(user)
 
             if not user_token:
                 logger.warning(
@@ -300,28 +625,37 @@ ERROR HANDLING:
                 self.supabase = None
                 return False
 
+            # Decode the email once per session; it can't change while the token is the same.
+            if self._user_email is None:
+                self._user_email = self._email_from_supabase_jwt(user_token)
+                # The console scopes Arcade tokens by `user.email || user.id`. If the entrypoint
+                # could only resolve an id (metadata not there yet), switch to the email now.
+                if self._user_email and (
+                        not self._arcade_user_id or "@" not in self._arcade_user_id):
+                    logger.info(
+                        f"Arcade user scope updated to {self._user_email} from the Supabase JWT")
+                    self._arcade_user_id = self._user_email
+
             try:
                 # Create the client scoped to this user
-                self.supabase = create_client(
-                    url,  # type: ignore
-                    key,  # type: ignore
-                    options=ClientOptions(
-                        headers={"Authorization": f"Bearer {user_token}"})
-                )
+                self.supabase = await _create_supabase_client(url, key, user_token)
+                self._supabase_user_token = user_token
             except Exception as e:
                 logger.error(
                     "Couldn't get suprabase bearer token, falling back to global credentials", e)
                 # Fallback to anon key
-                self.supabase = create_client(url, key)  # type: ignore
+                self.supabase = await _get_shared_supabase_client(url, key)
 
             logger.info(
                 f"Supabase client authenticated for user {self.user_id}")
 
-        # Fetch user profile to get timezone
+        # Fetch user profile to get timezone. The Gmail fields ride along so the first
+        # `get_gmail_integration_state` call is served from cache instead of another query.
         try:
-            profile_resp = self.supabase.table("user_profiles").select(
-                "timezone").eq("id", self.user_id).single().execute()
+            profile_resp = await self.supabase.table("user_profiles").select(
+                "timezone, gmail_snoozed_until, gmail_connected").eq("id", self.user_id).single().execute()
             data = profile_resp.data
+            self._cache_gmail_state_from_profile(data, time.monotonic())
             if isinstance(data, dict):
                 val = data.get("timezone")
                 if isinstance(val, str):
@@ -338,9 +672,58 @@ ERROR HANDLING:
 
         return True
 
+    def _on_participant_connected(self, participant: rtc.RemoteParticipant) -> None:
+        if participant.kind != rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
+            self._human_participants[participant.identity] = participant
+            self._user_present.set()
+            self._refresh_user_token(participant)
+
+    def _refresh_user_token(self, participant: rtc.RemoteParticipant) -> None:
+        """
+        Keep the per-user Supabase client on the user's latest JWT.
+
+        When the user reconnects (or their metadata is updated) with a fresh token, swap the
+        client's Authorization header in place instead of building a new client, so the
+        session keeps its warm connections.
+        """
+        if self.supabase is None or self._supabase_user_token is None:
+            return
+        if participant.identity != self.user_id:
+            return
+        token = self._participant_token(participant)
+        if token and token != self._supabase_user_token:
+            self.supabase.postgrest.auth(token)
+            self._supabase_user_token = token
+            logger.info(f"Refreshed Supabase token for user {self.user_id}")
+
+    def _on_participant_disconnected(self, participant: rtc.RemoteParticipant) -> None:
+        self._human_participants.pop(participant.identity, None)
+        if not self._human_participants:
+            self._user_present.clear()
+
+    def _find_human_participant(self) -> Optional[rtc.RemoteParticipant]:
+        """Return the first non-agent participant currently in the room, if any."""
+        return next(iter(self._human_participants.values()), None)
+
+    def _participant_token(self, participant: rtc.RemoteParticipant) -> str:
+        """
+        Return the Supabase JWT from a participant's metadata (set by /api/livekit-token).
+
+        The parsed token is cached per participant, so repeated hydrate attempts (e.g. from
+        tool calls while the user is still connecting) don't re-decode the same JSON.
+        """
+        metadata = participant.metadata or ""
+        cached = self._metadata_token_cache.get(participant.sid)
+        if cached is not None and cached[0] == metadata:
+            return cached[1]
+
+        user_token = _token_from_metadata(metadata)
+        self._metadata_token_cache[participant.sid] = (metadata, user_token)
+        return user_token
+
     async def greet(self):
         await self.session.generate_reply(
-            instructions="Greet the user and offer your assistance.",
+            instructions=f"{self._current_time_context()}\n\nGreet the user and offer your assistance.",
             allow_interruptions=True)
 
     def _email_from_supabase_jwt(self, jwt_token: str) -> Optional[str]:
@@ -356,20 +739,12 @@ ERROR HANDLING:
         - We do NOT trust this value for authorization decisions. It's only used as an
           identifier for Arcade token scoping.
         """
-        try:
-            parts = jwt_token.split(".")
-            if len(parts) < 2:
-                return None
-            payload_b64 = parts[1]
-            # base64url decode with padding
-            payload_b64 += "=" * (-len(payload_b64) % 4)
-            payload_json = base64.urlsafe_b64decode(
-                payload_b64.encode("utf-8")).decode("utf-8")
-            payload = json.loads(payload_json)
-            email = payload.get("email")
-            return email if isinstance(email, str) and email else None
-        except Exception:
-            return None
+        return _email_from_jwt(jwt_token)
+
+    @function_tool()
+    async def get_current_time(self):
+        """Get the current local time and date. Call this before resolving relative times or dates."""
+        return self._current_time_context()
 
     @function_tool()
     async def get_day_context(
@@ -381,6 +756,7 @@ ERROR HANDLING:
         and get IDs for events/tasks. Please use the date format YYYY-MM-DD.
         """
         logger.info(f"Fetching context for {date}")
+        await self._await_hydration()
         if self.supabase is None:
             return (
                 "System Alert: Calendar/task database is not configured for this session. "
@@ -388,73 +764,92 @@ ERROR HANDLING:
             )
         try:
             try:
-                dt_object = parser.parse(date)
-            except parser.ParserError:
+                # The prompt asks for YYYY-MM-DD; fromisoformat also accepts full ISO timestamps.
+                dt_object = datetime.fromisoformat(date)
+            except ValueError:
                 return f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD."
 
             day_str = dt_object.strftime("%Y-%m-%d")
 
-            # Create timezone-aware datetime for the start of the day in user's timezone
-            # Then convert to UTC for querying
-            start_local = datetime.combine(dt_object.date(), datetime.min.time()).replace(
-                tzinfo=self.user_timezone)
-            end_local = datetime.combine(dt_object.date(), datetime.max.time()).replace(
-                tzinfo=self.user_timezone)
+            # Day bounds in the user's timezone, converted to UTC for querying by subtracting
+            # the zone's UTC offset. The offset is looked up separately for each end so days
+            # with a DST transition still get the right bounds. The range is half-open
+            # [start, next midnight), so it's an exact index range scan with no edge gap.
+            start_naive = datetime(dt_object.year, dt_object.month, dt_object.day)
+            end_naive = start_naive + timedelta(days=1)
+            start_offset = self.user_timezone.utcoffset(start_naive) or timedelta(0)
+            end_offset = self.user_timezone.utcoffset(end_naive) or timedelta(0)
 
-            start_utc = start_local.astimezone(timezone.utc)
-            end_utc = end_local.astimezone(timezone.utc)
+            start_utc = (start_naive - start_offset).replace(tzinfo=timezone.utc)
+            end_utc = (end_naive - end_offset).replace(tzinfo=timezone.utc)
 
             start_filter = start_utc.isoformat()
             end_filter = end_utc.isoformat()
+            # Open tasks are limited to undated ones and those due within a week of this day
+            # (see docs/migrations/008_get_day_context_task_horizon.sql).
+            task_horizon = (end_utc + timedelta(days=_TASK_HORIZON_DAYS)).isoformat()
 
             # Ensure Supabase is connected (checked above, but for type safety)
             assert self.supabase is not None
 
-            events_response = (
-                self.supabase.table("events")
-                .select("*")
-                .gte("start", start_filter)
-                .lte("start", end_filter)
-                .order("start")
-                .execute()
-            )
-            events = events_response.data
-
-            tasks_response = (
-                self.supabase.table("tasks")
-                .select("*")
-                .eq("done", False)
-                .execute()
-            )
-            tasks = tasks_response.data
-
-            context_str = f"## STATUS REPORT FOR {day_str}\n"
+            cache_key = (self.user_id, day_str)
+            cached = self._day_context_cache.get(cache_key)
+            if cached is not None and time.monotonic() - cached[0] < self._day_context_ttl:
+                logger.debug(f"Using cached day context for {day_str}")
+                return f"{self._current_time_context()}\n{cached[1]}"
+
+            version = self._day_context_version
+
+            # Events + open tasks come back from one RPC (see docs/migrations/002_get_day_context_rpc.sql)
+            # instead of two separate table queries. Overlapping calls for the same day share it.
+            pending = self._day_context_inflight.get(cache_key)
+            if pending is None:
+                pending = asyncio.ensure_future(self.supabase.rpc(
+                    "get_day_context",
+                    {"p_user": self.user_id, "p_start": start_filter,
+                        "p_end": end_filter, "p_task_horizon": task_horizon},
+                ).execute())
+                self._day_context_inflight[cache_key] = pending
+                pending.add_done_callback(
+                    functools.partial(self._on_day_context_fetched, cache_key))
+            response = await asyncio.shield(pending)
+            day = response.data if isinstance(response.data, dict) else {}
+            events = day.get("events")
+            tasks = day.get("tasks")
+
+            # Collect lines and join once at the end (avoids quadratic `+=` string building).
+            lines = [f"## STATUS REPORT FOR {day_str}"]
 
             if not isinstance(events, list):
-                context_str += "[TIMELINE]: Clear. No fixed events.\n"
+                lines.append("[TIMELINE]: Clear. No fixed events.")
             else:
-                context_str += "[TIMELINE]:\n"
+                lines.append("[TIMELINE]:")
+                # Outside DST transitions the whole day shares one UTC offset, so each event's
+                # local time can be read off the timestamp string without parsing it.
+                day_offset_min = int(start_offset.total_seconds()) // 60 \
+                    if start_offset == end_offset else None
                 for e in events:
                     if not isinstance(e, dict):
                         continue
-                    # Parse UTC time from DB
                     start_val = e.get("start")
                     if not isinstance(start_val, str):
                         continue
-                    start_str = start_val.replace('Z', '+00:00')
-                    dt_utc = datetime.fromisoformat(start_str)
-
-                    # Convert to user timezone for display
-                    dt_local = dt_utc.astimezone(self.user_timezone)
-                    time_str = dt_local.strftime("%H:%M")
+                    time_str = _utc_iso_to_local_hm(start_val, day_offset_min) \
+                        if day_offset_min is not None else None
+                    if time_str is None:
+                        # Parse UTC time from DB (Python 3.12's fromisoformat accepts a trailing 'Z')
+                        # and convert to user timezone for display.
+                        dt_utc = datetime.fromisoformat(start_val)
+                        time_str = _fmt_hm(dt_utc.astimezone(self.user_timezone))
 
                     name = str(e.get("name", "Untitled"))
                     # ADDED ID HERE so the LLM can reference it for updates
-                    context_str += f"- {time_str}: {name} (ID: {e.get('id')})\n"
+                    lines.append(f"- {time_str}: {name} (ID: {e.get('id')})")
 
-            context_str += "\n[INTENT LEDGER / TASKS]:\n"
+            lines.append("")
+            lines.append("[INTENT LEDGER / TASKS]:")
             if not isinstance(tasks, list):
-                context_str += "- No open loops.\n"
+                lines.append("- No open loops.")
             else:
                 for t in tasks:
                     if not isinstance(t, dict):
@@ -462,9 +857,13 @@ ERROR HANDLING:
                     due_val = t.get("due")
                     due = f" (Due: {due_val})" if due_val else ""
                     name = str(t.get("name", "Untitled"))
-                    context_str += f"- [ ] {name}{due} (ID: {t.get('id')})\n"
+                    lines.append(f"- [ ] {name}{due} (ID: {t.get('id')})")
 
-            return context_str
+            report = "\n".join(lines) + "\n"
+            if version == self._day_context_version:
+                self._day_context_cache[cache_key] = (time.monotonic(), report)
+            # The clock goes in front of (not into) the cached report, so it's always current.
+            return f"{self._current_time_context()}\n{report}"
 
         except Exception as e:
             logger.error(f"Error getting day context: {e}", exc_info=True)
@@ -473,17 +872,11 @@ ERROR HANDLING:
     async def _broadcast_change(self, entity: str, action: str, data: Any):
         """Broadcast a change to the room using LiveKit data messages."""
         try:
-            # Helper to handle UUIDs and other non-JSON types
-            def json_default(obj: Any):
-                if isinstance(obj, (datetime,)):
-                    return obj.isoformat()
-                return str(obj)
-
             payload = json.dumps({
-                "type": f"{entity}_update",
+                "type": _CHANGE_TYPES.get(entity) or f"{entity}_update",
                 "action": action,
                 "data": data
-            }, default=json_default)
+            }, default=_json_default, separators=_COMPACT_JSON)
             await self.room.local_participant.publish_data(
                 payload.encode("utf-8"),
                 reliable=True
@@ -492,6 +885,119 @@ ERROR HANDLING:
         except Exception as e:
             logger.error(f"Error broadcasting change: {e}")
 
+    def _invalidate_day_context(self) -> None:
+        """Drop cached day reports after a write (tasks appear in every day's report)."""
+        self._day_context_version += 1
+        self._day_context_cache.clear()
+        # Fetches already in flight predate the write; later callers must not join them.
+        self._day_context_inflight.clear()
+
+    def _on_day_context_fetched(self, key: tuple[Optional[str], str], fut: asyncio.Future) -> None:
+        if self._day_context_inflight.get(key) is fut:
+            del self._day_context_inflight[key]
+
+    def _broadcast_change_soon(self, entity: str, action: str, data: Any) -> None:
+        """
+        Schedule `_broadcast_change` in the background.
+
+        The UI broadcast doesn't affect the tool result, so mutation tools return to the LLM
+        immediately instead of waiting on the LiveKit data publish.
+        """
+        self._spawn(self._broadcast_change(entity, action, data),
+                    name=f"broadcast_{entity}_{action}")
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any], name: str) -> Optional[asyncio.Task]:
+        """
+        Run `coro` as a tracked background task that logs (rather than drops) failures.
+
+        At most `_MAX_BACKGROUND_TASKS` run at once per agent; beyond that the coroutine is
+        dropped (and logged) rather than letting a misbehaving session pile up tasks.
+        """
+        if len(self._background_tasks) >= _MAX_BACKGROUND_TASKS:
+            logger.warning(
+                f"Too many background tasks; dropping {name}.")
+            coro.close()
+            return None
+
+        # Explicit context copy: the task must not share (or later observe) mutations of the
+        # calling tool's contextvars.
+        task = asyncio.create_task(
+            coro, name=name, context=contextvars.copy_context())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_task_done)
+        return task
+
+    def _cancel_background_tasks(self) -> None:
+        for task in list(self._background_tasks):
+            task.cancel()
+
+    def _on_background_task_done(self, task: asyncio.Task) -> None:
+        self._background_tasks.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(
+                f"Background task {task.get_name()} failed: {exc}", exc_info=exc)
+
+    def _write_in_background(
+        self,
+        name: str,
+        description: str,
+        run_query: Callable[[], Awaitable[Any]],
+        entity: str,
+        action: str,
+        broadcast_data: Callable[[Any], Any],
+    ) -> None:
+        """
+        Apply an idempotent write (delete task / mark done) without making the tool wait for it.
+
+        The tool confirms to the user right away; the query runs here, retried once on failure,
+        and the UI broadcast is sent only once it has actually landed. If it doesn't land (error,
+        or no row matched because the ID is wrong or RLS hides it), the agent tells the user.
+        """
+        async def run() -> None:
+            for attempt in (1, 2):
+                try:
+                    response = await run_query()
+                    break
+                except Exception as e:
+                    if attempt == 2:
+                        logger.error(f"Background write {name} failed: {e}", exc_info=True)
+                        self._report_failed_write(description, str(e))
+                        return
+                    logger.warning(f"Background write {name} failed, retrying: {e}")
+                    await asyncio.sleep(0.5)
+            if not response.data:
+                logger.warning(f"Background write {name} matched no rows")
+                self._report_failed_write(description, "no matching item was found")
+                return
+            # Again after the write: a lookup made while it was in flight may have cached old data.
+            self._invalidate_day_context()
+            data = broadcast_data(response)
+            if data:
+                self._broadcast_change_soon(entity, action, data)
+
+        # Explicit context copy, as in `_spawn`.
+        task = asyncio.create_task(run(), name=name, context=contextvars.copy_context())
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        # Optimistic: later reads in this session shouldn't serve the pre-write report.
+        self._invalidate_day_context()
+
+    def _report_failed_write(self, description: str, reason: str) -> None:
+        """Have the agent correct its earlier confirmation of a write that didn't land."""
+        try:
+            self.session.generate_reply(
+                instructions=(
+                    f"Tell the user briefly that {description} did not go through ({reason}), "
+                    "even though you confirmed it earlier. Offer to try again."
+                )
+            )
+        except RuntimeError:
+            # Session already closed; the failure is in the logs.
+            pass
+
     # --- EVENT TOOLS ---
 
     @function_tool()
@@ -500,43 +1006,156 @@ ERROR HANDLING:
         title: Annotated[str, "Title of the event"],
         start_iso: Annotated[str, "Start time in ISO 8601"],
         duration_minutes: Annotated[int, "Duration in minutes"] = 60,
-        notes: Annotated[Optional[str], "Optional notes"] = None
+        notes: Annotated[Optional[str], "Optional notes"] = None,
+        allow_overlap: Annotated[bool,
+                                 "Book even if it overlaps existing events. Only set after the user confirms."] = False,
     ):
-        """Schedule a new calendar event."""
+        """
+        Schedule a new calendar event.
+
+        If the slot overlaps existing events, nothing is booked and the conflicts are returned;
+        ask the user, then retry with allow_overlap=true or a different time.
+        """
         logger.info(f"Scheduling: {title}")
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
         try:
-            # Parse input time
-            # If naive, assume user timezone. If aware, convert to UTC.
-            dt = datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=self.user_timezone)
-
-            start_dt_utc = dt.astimezone(timezone.utc)
-            end_dt_utc = start_dt_utc + timedelta(minutes=duration_minutes)
-
-            data = {
-                "name": title,
-                "start": start_dt_utc.isoformat(),
-                "end": end_dt_utc.isoformat(),
-                "description": notes or "",
-                "owner": self.user_id  # Explicitly set owner to satisfy RLS
-            }
+            start_dt_utc, end_dt_utc = self._event_bounds_utc(start_iso, duration_minutes)
+
+            # Conflict check + insert in one round trip (see docs/migrations/007_book_event_if_free_rpc.sql).
+            response = await self.supabase.rpc(
+                "book_event_if_free",
+                {
+                    "p_owner": self.user_id,
+                    "p_start": start_dt_utc.isoformat(),
+                    "p_end": end_dt_utc.isoformat(),
+                    "p_name": title,
+                    "p_description": notes or "",
+                    "p_allow_overlap": allow_overlap,
+                },
+            ).execute()
+            result = response.data if isinstance(response.data, dict) else {}
+
+            conflicts = result.get("conflicts")
+            if conflicts:
+                clashes = self._describe_conflicts(conflicts)
+                return (
+                    f"Not scheduled: '{title}' overlaps {clashes}. Ask the user whether to book it "
+                    "anyway (allow_overlap=true) or pick another time."
+                )
 
-            response = self.supabase.table("events").insert(data).execute()
+            self._invalidate_day_context()
 
             # Broadcast the change if successful
-            if response.data:
-                await self._broadcast_change("event", "INSERT", response.data[0])
+            event = result.get("event")
+            if event:
+                self._broadcast_change_soon("event", "INSERT", event)
 
             # Return confirmation in user's local time
             start_local = start_dt_utc.astimezone(self.user_timezone)
-            return f"Confirmed. Scheduled '{title}' for {start_local.strftime('%H:%M')}."
+            return f"Confirmed. Scheduled '{title}' for {_fmt_hm(start_local)}."
         except Exception as e:
             logger.error(f"Error scheduling event: {e}", exc_info=True)
             return f"Failed to schedule: {str(e)}"
 
+    @function_tool()
+    async def schedule_events_batch(
+        self,
+        events: Annotated[list[EventDraft], "Events to create (title, start_iso, duration_minutes or null for 60, notes or null)"],
+        allow_overlap: Annotated[bool,
+                                 "Book even if some overlap existing events. Only set after the user confirms."] = False,
+    ):
+        """
+        Schedule several calendar events in one go (e.g. a plan the user just agreed to).
+
+        Prefer this over repeated schedule_event calls. If any event overlaps an existing one
+        or another event in the batch, nothing is booked and the conflicts are returned per
+        event; ask the user, then retry with allow_overlap=true or adjusted times.
+        """
+        logger.info(f"Scheduling batch of {len(events)} events")
+        await self._await_hydration()
+        if self.supabase is None:
+            return "Database not connected."
+        if not events:
+            return "No events given."
+        try:
+            drafts = []
+            for item in events:
+                start_dt_utc, end_dt_utc = self._event_bounds_utc(
+                    item["start_iso"], item.get("duration_minutes") or 60)
+                drafts.append({
+                    "name": item["title"],
+                    "start": start_dt_utc.isoformat(),
+                    "end": end_dt_utc.isoformat(),
+                    "description": item.get("notes") or "",
+                })
+
+            # Conflict check + multi-row insert in one round trip, under the same per-owner lock
+            # as schedule_event (see docs/migrations/009_book_events_if_free_rpc.sql).
+            response = await self.supabase.rpc(
+                "book_events_if_free",
+                {
+                    "p_owner": self.user_id,
+                    "p_events": drafts,
+                    "p_allow_overlap": allow_overlap,
+                },
+            ).execute()
+            result = response.data if isinstance(response.data, dict) else {}
+
+            conflicts = result.get("conflicts")
+            if conflicts:
+                by_index: dict[int, list[dict]] = {}
+                for c in conflicts:
+                    if isinstance(c, dict) and isinstance(c.get("index"), int):
+                        by_index.setdefault(c["index"], []).append(c)
+                clashes = "; ".join(
+                    f"'{events[i]['title']}' overlaps {self._describe_conflicts(cs)}"
+                    for i, cs in sorted(by_index.items())
+                    if 0 <= i < len(events)
+                )
+                return (
+                    f"Nothing scheduled: {clashes}. Ask the user whether to book them anyway "
+                    "(allow_overlap=true) or adjust the times."
+                )
+
+            self._invalidate_day_context()
+
+            for row in result.get("events") or []:
+                self._broadcast_change_soon("event", "INSERT", row)
+
+            booked = ", ".join(
+                f"'{item['title']}' at {_fmt_hm(datetime.fromisoformat(draft['start']).astimezone(self.user_timezone))}"
+                for item, draft in zip(events, drafts)
+            )
+            return f"Confirmed. Scheduled {len(drafts)} events: {booked}."
+        except Exception as e:
+            logger.error(f"Error scheduling events: {e}", exc_info=True)
+            return f"Failed to schedule events: {str(e)}"
+
+    def _describe_conflicts(self, conflicts: list) -> str:
+        """Render `book_event(s)_if_free` conflicts as "Name at HH:MM, ..." in the user's timezone."""
+        return ", ".join(
+            f"{c.get('name') or 'Untitled'} at "
+            f"{_fmt_hm(datetime.fromisoformat(c['start']).astimezone(self.user_timezone))}"
+            # Clashes between two drafts of the same batch carry the other draft's index.
+            + (" (also in this batch)" if c.get("batch_index") is not None else "")
+            for c in conflicts
+            if isinstance(c, dict) and c.get("start")
+        )
+
+    def _start_utc(self, start_iso: str) -> datetime:
+        """Parse an event start time as UTC. Naive times are taken to be in the user's timezone."""
+        dt = datetime.fromisoformat(start_iso)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=self.user_timezone)
+        return dt.astimezone(timezone.utc)
+
+    def _event_bounds_utc(self, start_iso: str, duration_minutes: int) -> tuple[datetime, datetime]:
+        """Parse an event start (naive = user's timezone) and return its UTC start/end."""
+        start_dt_utc = self._start_utc(start_iso)
+        return start_dt_utc, start_dt_utc + timedelta(minutes=duration_minutes)
+
     @function_tool()
     async def update_event(
         self,
@@ -548,62 +1167,41 @@ ERROR HANDLING:
     ):
         """Update an existing event. Only provide fields that need changing."""
         logger.info(f"Updating event {event_id}")
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
         try:
-            updates = {}
-            if title:
-                updates["name"] = title
-            if notes:
-                updates["description"] = notes
-
-            # Handle time logic if start or duration changes
             if start_iso or duration_minutes:
-                # We need to fetch the current event to calculate end time correctly
-                # if only one of the two variables is provided.
-                curr = self.supabase.table("events").select(
-                    "*").eq("id", event_id).execute()
-                if not curr.data:
+                # Start/end math happens in Postgres (docs/migrations/003_reschedule_event_rpc.sql):
+                # the new end keeps the old duration unless a new one is given, all in one
+                # round trip instead of SELECT + UPDATE. The start is normalized like in
+                # schedule_event, so a naive time means the user's local time (not the DB's zone).
+                response = await self.supabase.rpc(
+                    "reschedule_event",
+                    {
+                        "p_id": event_id,
+                        "p_start": self._start_utc(start_iso).isoformat() if start_iso else None,
+                        "p_duration_min": duration_minutes or None,
+                        "p_name": title or None,
+                        "p_description": notes or None,
+                    },
+                ).execute()
+                if not response.data:
                     return "Event not found."
+            else:
+                updates = {}
+                if title:
+                    updates["name"] = title
+                if notes:
+                    updates["description"] = notes
 
-                current_event = curr.data[0]
-                if not isinstance(current_event, dict):
-                    return "Event data format error."
-
-                # Determine base start time
-                start_val = current_event.get("start")
-                if not isinstance(start_val, str):
-                    return "Event start time missing."
-
-                new_start = start_iso if start_iso else start_val
-                start_dt = datetime.fromisoformat(
-                    new_start.replace('Z', '+00:00'))
-
-                # Determine duration
-                minutes: float = 60.0
-                if duration_minutes:
-                    minutes = float(duration_minutes)
-                else:
-                    # Calculate previous duration
-                    end_val = current_event.get("end")
-                    if isinstance(start_val, str) and isinstance(end_val, str):
-                        old_start = datetime.fromisoformat(
-                            start_val.replace('Z', '+00:00'))
-                        old_end = datetime.fromisoformat(
-                            end_val.replace('Z', '+00:00'))
-                        minutes = (old_end - old_start).total_seconds() / 60
-
-                end_dt = start_dt + timedelta(minutes=minutes)
-
-                updates["start"] = new_start
-                updates["end"] = end_dt.isoformat()
-
-            response = self.supabase.table("events").update(
-                updates).eq("id", event_id).execute()
+                response = await self.supabase.table("events").update(
+                    updates).eq("id", event_id).execute()
+            self._invalidate_day_context()
 
             # Broadcast the change
             if response.data:
-                await self._broadcast_change("event", "UPDATE", response.data[0])
+                self._broadcast_change_soon("event", "UPDATE", response.data[0])
 
             return f"Event {event_id} updated successfully."
         except Exception as e:
@@ -617,12 +1215,19 @@ ERROR HANDLING:
     ):
         """Remove an event from the calendar."""
         logger.info(f"Deleting event {event_id}")
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
+        # Awaited, unlike the task writes: deleting an event destroys data, so only confirm
+        # once it has actually happened.
         try:
-            self.supabase.table("events").delete().eq("id", event_id).execute()
+            response = await self.supabase.table("events").delete().eq("id", event_id).execute()
+            if not response.data:
+                return f"No event with ID {event_id} was found. Nothing was deleted."
+            self._invalidate_day_context()
+
             # Broadcast just the ID for deletion
-            await self._broadcast_change("event", "DELETE", {"id": event_id})
+            self._broadcast_change_soon("event", "DELETE", {"id": event_id})
             return "Event deleted."
         except Exception as e:
             logger.error(f"Error deleting event: {e}", exc_info=True)
@@ -637,6 +1242,7 @@ ERROR HANDLING:
         due_iso: Annotated[Optional[str], "Optional due date ISO"] = None
     ):
         """Log a new task."""
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
         try:
@@ -646,11 +1252,12 @@ ERROR HANDLING:
                 "due": due_iso,
                 "owner": self.user_id  # Explicitly set owner
             }
-            response = self.supabase.table("tasks").insert(data).execute()
+            response = await self.supabase.table("tasks").insert(data).execute()
+            self._invalidate_day_context()
 
             # Broadcast change
             if response.data:
-                await self._broadcast_change("task", "INSERT", response.data[0])
+                self._broadcast_change_soon("task", "INSERT", response.data[0])
 
             return f"Commitment logged: {name}"
         except Exception as e:
@@ -665,6 +1272,7 @@ ERROR HANDLING:
         due_iso: Annotated[Optional[str], "New due date"] = None
     ):
         """Update a task's details."""
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
         try:
@@ -674,12 +1282,13 @@ ERROR HANDLING:
             if due_iso:
                 updates["due"] = due_iso
 
-            response = self.supabase.table("tasks").update(
+            response = await self.supabase.table("tasks").update(
                 updates).eq("id", task_id).execute()
+            self._invalidate_day_context()
 
             # Broadcast change
             if response.data:
-                await self._broadcast_change("task", "UPDATE", response.data[0])
+                self._broadcast_change_soon("task", "UPDATE", response.data[0])
 
             return "Task updated."
         except Exception as e:
@@ -692,16 +1301,18 @@ ERROR HANDLING:
         task_id: Annotated[int, "The ID of the task"]
     ):
         """Permanently delete a task."""
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
-        try:
-            self.supabase.table("tasks").delete().eq("id", task_id).execute()
+        supabase = self.supabase
+        self._write_in_background(
+            f"delete_task:{task_id}",
+            f"deleting task {task_id}",
+            lambda: supabase.table("tasks").delete().eq("id", task_id).execute(),
             # Broadcast ID for deletion
-            await self._broadcast_change("task", "DELETE", {"id": task_id})
-            return "Task deleted."
-        except Exception as e:
-            logger.error(f"Error deleting task: {e}", exc_info=True)
-            return f"Error deleting task: {str(e)}"
+            "task", "DELETE", lambda _: {"id": task_id},
+        )
+        return "Task deleted."
 
     @function_tool()
     async def mark_task_done(
@@ -709,20 +1320,18 @@ ERROR HANDLING:
         task_id: Annotated[int, "The numerical ID of the task"]
     ):
         """Mark a task as complete."""
+        await self._await_hydration()
         if self.supabase is None:
             return "Database not connected."
-        try:
-            response = self.supabase.table("tasks").update(
-                {"done": True}).eq("id", task_id).execute()
-
-            # Broadcast change
-            if response.data:
-                await self._broadcast_change("task", "UPDATE", response.data[0])
-
-            return "Task marked as done. Good job."
-        except Exception as e:
-            logger.error(f"Error marking task done: {e}", exc_info=True)
-            return f"Error updating task: {str(e)}"
+        supabase = self.supabase
+        self._write_in_background(
+            f"mark_task_done:{task_id}",
+            f"marking task {task_id} as done",
+            lambda: supabase.table("tasks").update(
+                {"done": True}).eq("id", task_id).execute(),
+            "task", "UPDATE", lambda response: response.data[0] if response.data else None,
+        )
+        return "Task marked as done. Good job."
 
     # --- GMAIL INTEGRATION STATE ---
 
@@ -738,28 +1347,58 @@ ERROR HANDLING:
 
         This result is cached for 30 seconds to avoid repeated DB calls.
         """
+        # Without an Arcade client no Gmail tool can work, whatever the profile says,
+        # so don't spend a DB round trip finding out.
+        if self._arcade_client is None:
+            return self._format_gmail_state_response("unknown", tools_available=False)
+
         # Check if we have a recent cached result to avoid repeated DB calls.
-        now = datetime.now()
-        if self._gmail_state_cache:
-            cached_at = self._gmail_state_cache.get("checked_at")
-            if cached_at and (now - cached_at).total_seconds() < self._gmail_cache_ttl:
-                state = self._gmail_state_cache.get("state", "unknown")
-                logger.debug(f"Using cached Gmail state: {state}")
+        state = self._cached_gmail_state()
+        if state is not None:
+            logger.debug(f"Using cached Gmail state: {state}")
+            return self._format_gmail_state_response(state)
+
+        async with self._gmail_state_lock:
+            # Another call may have refreshed the cache while we waited for the lock.
+            state = self._cached_gmail_state()
+            if state is not None:
                 return self._format_gmail_state_response(state)
+            return self._format_gmail_state_response(await self._fetch_gmail_state())
 
+    def _cached_gmail_state(self) -> Optional[str]:
+        """Return the cached Gmail state if it is still fresh, else None."""
+        cache = self._gmail_state_cache
+        # Monotonic clock: cheaper than datetime.now() and immune to wall-clock jumps.
+        if cache is None or time.monotonic() - cache.checked_at >= self._gmail_cache_ttl:
+            return None
+        if (
+            cache.state == "snoozed"
+            and cache.snooze_epoch is not None
+            and cache.snooze_epoch <= time.time()
+        ):
+            return "connected" if cache.connected else "not_connected"
+        return cache.state
+
+    def _invalidate_gmail_state(self) -> None:
+        """Drop the cached Gmail state so the next check hits the DB (e.g. after a connect prompt)."""
+        self._gmail_state_cache = None
+
+    async def _fetch_gmail_state(self) -> str:
+        """Look up the Gmail integration state in Supabase and cache it."""
         logger.info("Checking Gmail integration state (fresh lookup)...")
+        now = time.monotonic()
 
         # Ensure Supabase is hydrated. This avoids the "agent joined before user" race.
         hydrated = await self._ensure_user_and_supabase(max_wait_seconds=3)
         if not hydrated or self.supabase is None or self.user_id is None:
             # Cache as unknown so we don't retry immediately.
-            self._gmail_state_cache = {"state": "unknown", "checked_at": now}
-            return self._format_gmail_state_response("unknown")
+            self._gmail_state_cache = _GmailState("unknown", now)
+            return "unknown"
 
         assert self.supabase is not None
         try:
             # Query user profile for gmail_snoozed_until and gmail_connected.
-            response = (
+            response = await (
                 self.supabase.table("user_profiles")
                 .select("gmail_snoozed_until, gmail_connected")
                 .eq("id", self.user_id)
@@ -767,73 +1406,50 @@ ERROR HANDLING:
                 .execute()
             )
 
-            profile = response.data
-            if not isinstance(profile, dict):
-                # No profile row yet - treat as not connected.
-                self._gmail_state_cache = {
-                    "state": "not_connected", "checked_at": now}
-                return self._format_gmail_state_response("not_connected")
-
-            snoozed_until = str(profile.get("gmail_snoozed_until")) if profile.get(
-                "gmail_snoozed_until") else None
-            is_connected = bool(profile.get("gmail_connected", False))
-
-            # Check if snooze is currently active.
-            if snoozed_until:
-                try:
-                    snooze_dt = datetime.fromisoformat(
-                        snoozed_until.replace("Z", "+00:00"))
-                    if snooze_dt > datetime.now(snooze_dt.tzinfo):
-                        self._gmail_state_cache = {
-                            "state": "snoozed", "checked_at": now}
-                        return self._format_gmail_state_response("snoozed")
-                except Exception:
-                    # Parsing failed - treat as not snoozed.
-                    logger.warning(
-                        "Failed to parse gmail_snoozed_until; treating as not snoozed.")
-
-            # Determine final state based on gmail_connected flag.
-            state = "connected" if is_connected else "not_connected"
-            self._gmail_state_cache = {"state": state, "checked_at": now}
-            return self._format_gmail_state_response(state)
+            return self._cache_gmail_state_from_profile(response.data, now)
 
         except Exception as e:
             logger.error(f"Error checking Gmail state: {e}")
             # On error, cache as unknown briefly to avoid hammering the DB.
-            self._gmail_state_cache = {"state": "unknown", "checked_at": now}
-            return self._format_gmail_state_response("unknown")
+            self._gmail_state_cache = _GmailState("unknown", now)
+            return "unknown"
+
+    def _cache_gmail_state_from_profile(self, profile: Any, checked_at: float) -> str:
+        """Derive the Gmail state from a `user_profiles` row, cache it, and return it."""
+        if not isinstance(profile, dict):
+            # No profile row yet - treat as not connected.
+            self._gmail_state_cache = _GmailState("not_connected", checked_at)
+            return "not_connected"
+
+        snoozed_until = str(profile.get("gmail_snoozed_until")) if profile.get(
+            "gmail_snoozed_until") else None
+        is_connected = bool(profile.get("gmail_connected", False))
+
+        # Check if snooze is currently active.
+        if snoozed_until:
+            try:
+                snooze_epoch = datetime.fromisoformat(snoozed_until).timestamp()
+                if snooze_epoch > time.time():
+                    self._gmail_state_cache = _GmailState(
+                        "snoozed", checked_at, snooze_epoch=snooze_epoch, connected=is_connected)
+                    return "snoozed"
+            except Exception:
+                # Parsing failed - treat as not snoozed.
+                logger.warning(
+                    "Failed to parse gmail_snoozed_until; treating as not snoozed.")
+
+        # Determine final state based on gmail_connected flag.
+        state = "connected" if is_connected else "not_connected"
+        self._gmail_state_cache = _GmailState(state, checked_at)
+        return state
 
     def _format_gmail_state_response(self, state: str, tools_available: bool = True) -> str:
         """Format a consistent response string based on Gmail state and tool availability."""
         # If Arcade SDK is not configured, override the response regardless of DB state.
         if not tools_available:
-            return (
-                "GMAIL_TOOLS_UNAVAILABLE: Gmail tools (list_emails, search_emails, etc.) are not configured. "
-                "This is a setup issue. Tell the user: 'Gmail tools are temporarily unavailable. "
-                "Try reconnecting or ask again in a moment.'"
-            )
-
-        if state == "connected":
-            return (
-                "GMAIL_CONNECTED: Gmail is connected and ready. "
-                "You can now use list_emails, search_emails, or get_email_thread."
-            )
-        elif state == "snoozed":
-            return (
-                "GMAIL_SNOOZED: The user has snoozed Gmail integration. "
-                "Do NOT use Gmail tools. Tell them they can reconnect from the console when ready."
-            )
-        elif state == "not_connected":
-            return (
-                "GMAIL_NOT_CONNECTED: Gmail is not connected. "
-                "Call prompt_gmail_connect to show the auth UI, then tell the user to click Connect."
-            )
-        else:
-            # Unknown state - allow Gmail tools to try (they'll fail with auth error if needed).
-            return (
-                "GMAIL_UNKNOWN: Could not determine Gmail status. "
-                "You may try Gmail tools - they will fail gracefully if not authorized."
-            )
+            return _GMAIL_TOOLS_UNAVAILABLE
+        # Unknown state - allow Gmail tools to try (they'll fail with auth error if needed).
+        return _GMAIL_STATE_RESPONSES.get(state, _GMAIL_STATE_RESPONSES["unknown"])
 
     async def _publish_ui_event(self, event: str, payload: dict) -> bool:
         """
@@ -844,11 +1460,19 @@ ERROR HANDLING:
         - We include a `text` field so the message also appears in the transcript UI as a fallback.
         """
         try:
-            if not getattr(self, "room", None) or not getattr(self.room, "local_participant", None):
+            if self.room is None or not getattr(self.room, "local_participant", None):
                 logger.warning(
                     "Cannot publish UI event: agent is not attached to a LiveKit room yet.")
                 return False
 
+            now = time.monotonic()
+            last = self._last_ui_event.get(event)
+            if last is not None and now - last < self._ui_event_dedupe_window:
+                # The UI is already showing this nudge; report success without re-sending.
+                logger.debug(f"Suppressing duplicate UI event: {event}")
+                return True
+            self._last_ui_event[event] = now
+
             message = {
                 "type": "ui_event",
                 "event": event,
@@ -859,15 +1483,19 @@ ERROR HANDLING:
             #
             # IMPORTANT:
             # - LiveKit's Python `publish_data` is async; if we don't await it, the message is never sent.
-            # - The frontend decodes bytes -> string -> JSON, and LiveKit will UTF-8 encode strings for us.
+            # - The frontend decodes bytes -> string -> JSON. We hand over compact UTF-8 bytes
+            #   directly, same as `_broadcast_change`.
             await self.room.local_participant.publish_data(
-                json.dumps(message),
+                json.dumps(message, default=_json_default,
+                           separators=_COMPACT_JSON).encode("utf-8"),
                 reliable=True,
                 topic="ui",
             )
             return True
         except Exception as e:
             logger.warning(f"Failed to publish UI event {event}: {e}")
+            # Let an immediate retry through; nothing reached the UI.
+            self._last_ui_event.pop(event, None)
             return False
 
     @function_tool()
@@ -887,6 +1515,9 @@ ERROR HANDLING:
             "finish sign-in, then tell me to retry."
         )
 
+        # The user is about to (re)connect; don't serve a stale "not connected" on the retry.
+        self._invalidate_gmail_state()
+
         sent = await self._publish_ui_event(
             "gmail_connect_required",
             {
@@ -907,13 +1538,46 @@ ERROR HANDLING:
     # These use the Arcade SDK directly, bypassing the MCP layer which has timing/connection issues.
     # This is the same approach used by read_gmail.py and works reliably.
 
-    def _call_arcade_tool(self, tool_name: str, tool_input: dict) -> dict:
+    async def _call_arcade_tool(self, tool_name: str, tool_input: dict) -> dict:
         """
-        Call an Arcade tool using the SDK directly (synchronous).
+        Call an Arcade tool using the async SDK client directly.
 
         This bypasses the MCP layer which has timing issues in LiveKit sessions.
         Same approach as read_gmail.py, which works reliably.
+
+        Identical calls that overlap (e.g. parallel tool calls in one turn) share a single
+        request. Arcade has no batch execute endpoint, so distinct calls are still sent
+        individually over the client's pooled connections.
         """
+        key = (tool_name, json.dumps(tool_input, sort_keys=True, default=str))
+        ttl = _GMAIL_CACHE_TTLS.get(tool_name)
+        if ttl is not None:
+            cached = self._gmail_content_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                self._gmail_content_cache.move_to_end(key)
+                return cached[1]
+
+        pending = self._arcade_inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.ensure_future(self._execute_arcade_tool(tool_name, tool_input))
+        self._arcade_inflight[key] = pending
+        try:
+            result = await asyncio.shield(pending)
+        finally:
+            if self._arcade_inflight.get(key) is pending:
+                del self._arcade_inflight[key]
+
+        if ttl is not None and not (isinstance(result, dict) and "error" in result):
+            self._gmail_content_cache[key] = (time.monotonic(), result)
+            self._gmail_content_cache.move_to_end(key)
+            while len(self._gmail_content_cache) > _GMAIL_CONTENT_CACHE_SIZE:
+                self._gmail_content_cache.popitem(last=False)
+        return result
+
+    async def _execute_arcade_tool(self, tool_name: str, tool_input: dict) -> dict:
+        """Execute a single Arcade tool call and normalize the result/error into a dict."""
         if not self._arcade_client:
             return {"error": "Arcade client not configured. Set ARCADE_API_KEY in backend/.env.local"}
 
@@ -923,27 +1587,37 @@ ERROR HANDLING:
         try:
             # Execute the tool call directly via Arcade SDK.
             # The OAuth token is already stored in Arcade under this user_id (from console auth flow).
-            res = self._arcade_client.tools.execute(
+            res = await self._arcade_client.tools.execute(
                 tool_name=tool_name,
                 input=tool_input,
                 user_id=self._arcade_user_id,
             )
 
-            # Arcade responses typically put tool output under `res.output.value`.
-            output = getattr(getattr(res, "output", None), "value", None)
+            # Arcade responses put tool output under `res.output.value`.
+            try:
+                output = res.output.value  # type: ignore[union-attr]
+            except AttributeError:
+                output = None
             if output is not None:
                 return output
 
-            # Fallback: check if there's an error or return raw response.
-            if hasattr(res, "error") and getattr(res, "error"):  # type: ignore
-                return {"error": str(getattr(res, "error"))}  # type: ignore
+            # No value: surface the tool's own error if it reported one.
+            err = getattr(getattr(res, "output", None), "error", None) or getattr(res, "error", None)
+            if err:
+                error_msg = str(getattr(err, "message", None) or err)
+                if _AUTH_ERR_RE.search(error_msg):
+                    self._invalidate_gmail_state()
+                return {"error": error_msg}
 
-            return {"result": str(res)}
+            logger.warning(f"Arcade tool {tool_name} returned no output value")
+            return {"error": f"{tool_name} returned no result. Try again or rephrase the request."}
 
         except Exception as e:
             error_msg = str(e)
             # Common error: user hasn't authorized Gmail yet.
-            if "authorization" in error_msg.lower() or "not authorized" in error_msg.lower():
+            if _AUTH_ERR_RE.search(error_msg):
+                # The cached "connected" state is evidently wrong; re-check on the next call.
+                self._invalidate_gmail_state()
                 return {"error": "Gmail not authorized. User needs to click Connect in the console."}
             return {"error": f"Arcade tool call failed: {error_msg}"}
 
@@ -964,13 +1638,9 @@ ERROR HANDLING:
         # Clamp to reasonable range.
         n_emails = max(1, min(20, n_emails))
 
-        # Call Arcade Gmail tool synchronously (the SDK is sync, run in executor to not block).
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: self._call_arcade_tool(
-                "Gmail.ListEmails", {"n_emails": n_emails})
-        )
+        # Call Arcade Gmail tool (async client, so no executor thread hop).
+        result = await self._call_arcade_tool(
+            "Gmail.ListEmails", {"n_emails": n_emails})
 
         # Check for errors.
         if isinstance(result, dict) and "error" in result:
@@ -981,20 +1651,10 @@ ERROR HANDLING:
         if not isinstance(emails, list):
             return "No emails found or unable to retrieve emails."
 
-        # Build a voice-friendly summary.
-        summary_parts = [f"Found {len(emails)} recent emails:"]
-        for i, email in enumerate(emails[:n_emails], 1):
-            if not isinstance(email, dict):
-                continue
-            sender = email.get("from") or email.get(
-                "sender") or "Unknown sender"
-            subject = email.get("subject") or "(no subject)"
-            # Truncate long subjects for voice.
-            if isinstance(subject, str) and len(subject) > 60:
-                subject = subject[:57] + "..."
-            summary_parts.append(f"{i}. From {sender}: {subject}")
-
-        return "\n".join(summary_parts)
+        # Structured result; the LLM phrases it for voice in its own reply.
+        return _tool_json({"emails": [
+            _email_summary(email) for email in emails[:n_emails] if isinstance(email, dict)
+        ]})
 
     @function_tool()
     async def search_emails(
@@ -1024,12 +1684,8 @@ ERROR HANDLING:
             tool_input["subject"] = subject
 
         # Call Arcade Gmail tool.
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: self._call_arcade_tool(
-                "Gmail.ListEmailsByHeader", tool_input)
-        )
+        result = await self._call_arcade_tool(
+            "Gmail.ListEmailsByHeader", tool_input)
 
         # Check for errors.
         if isinstance(result, dict) and "error" in result:
@@ -1048,18 +1704,9 @@ ERROR HANDLING:
                 search_desc.append(f"about '{subject}'")
             return f"No emails found {' '.join(search_desc)}."
 
-        # Build voice-friendly summary.
-        summary_parts = [f"Found {len(emails)} matching emails:"]
-        for i, email in enumerate(emails[:limit], 1):
-            if not isinstance(email, dict):
-                continue
-            sender_addr = email.get("from") or email.get("sender") or "Unknown"
-            subj = email.get("subject") or "(no subject)"
-            if len(subj) > 50:
-                subj = subj[:47] + "..."
-            summary_parts.append(f"{i}. From {sender_addr}: {subj}")
-
-        return "\n".join(summary_parts)
+        return _tool_json({"emails": [
+            _email_summary(email) for email in emails[:limit] if isinstance(email, dict)
+        ]})
 
     @function_tool()
     async def get_email_thread(
@@ -1074,38 +1721,55 @@ ERROR HANDLING:
         """
         logger.info(f"Fetching email thread: {thread_id}")
 
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: self._call_arcade_tool(
-                "Gmail.GetThread", {"thread_id": thread_id})
-        )
+        result = await self._call_arcade_tool(
+            "Gmail.GetThread", {"thread_id": thread_id})
 
         if isinstance(result, dict) and "error" in result:
             return f"Error fetching thread: {result['error']}"
 
         # Format thread for voice (summarize if too long).
         if isinstance(result, dict):
-            messages = result.get("messages") or []
-            if not messages:
+            if not result.get("messages"):
                 return "Thread found but no messages in it."
+            return _tool_json(_thread_summary(result))
 
-            parts = [f"Thread has {len(messages)} message(s):"]
-            for msg in messages[:3]:  # Limit to first 3 for voice.
-                if isinstance(msg, dict):
-                    sender = msg.get("from") or "Unknown"
-                    body = msg.get("body") or msg.get("snippet") or ""
-                    # Truncate body for voice.
-                    if len(body) > 200:
-                        body = body[:197] + "..."
-                    parts.append(f"From {sender}: {body}")
+        return str(result)
 
-            if len(messages) > 3:
-                parts.append(f"...and {len(messages) - 3} more messages.")
+    @function_tool()
+    async def get_email_threads(
+        self,
+        thread_ids: Annotated[list[str], "The Gmail thread IDs to retrieve (up to 10)"],
+    ):
+        """
+        Get the content of several email threads at once.
 
-            return "\n".join(parts)
+        Prefer this over repeated get_email_thread calls when the user wants more than one
+        email in full (e.g. "read me the top 3"). Thread IDs come from list_emails or
+        search_emails results.
+        """
+        # dict.fromkeys drops duplicates but keeps the order the user will hear them in.
+        thread_ids = list(dict.fromkeys(thread_ids))[:_MAX_THREADS_PER_CALL]
+        logger.info(f"Fetching {len(thread_ids)} email threads")
+        if not thread_ids:
+            return "No thread IDs given."
+
+        # Arcade has no batch endpoint; overlapping the calls costs one round trip instead of N.
+        results = await asyncio.gather(
+            *(self._call_arcade_tool("Gmail.GetThread", {"thread_id": tid}) for tid in thread_ids),
+            return_exceptions=True,
+        )
 
-        return str(result)
+        threads = []
+        for tid, result in zip(thread_ids, results):
+            if isinstance(result, BaseException):
+                threads.append({"thread_id": tid, "error": str(result)})
+            elif isinstance(result, dict) and "error" in result:
+                threads.append({"thread_id": tid, "error": result["error"]})
+            elif isinstance(result, dict):
+                threads.append({"thread_id": tid, **_thread_summary(result)})
+            else:
+                threads.append({"thread_id": tid, "content": str(result)})
+        return _tool_json({"threads": threads})
 
 
 server = AgentServer()
@@ -1113,6 +1777,18 @@ server = AgentServer()
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    # Build the shared connection pool before the first job arrives.
+    _get_http_transport()
+
+    # One Arcade client per worker process, shared by every session it runs.
+    # NOTE: it's async, so its warmup request is issued from `entrypoint` (on the job's event
+    # loop); running it here would bind the connection pool to a throwaway loop.
+    arcade_api_key = os.environ.get("ARCADE_API_KEY")
+    proc.userdata["arcade"] = AsyncArcade(
+        api_key=arcade_api_key,
+        http_client=httpx.AsyncClient(
+            transport=_get_http_transport(), timeout=_ARCADE_TIMEOUT),
+    ) if arcade_api_key else None
 
 
 server.setup_fnc = prewarm
@@ -1130,36 +1806,43 @@ async def _derive_arcade_user_id(ctx: JobContext, max_wait_seconds: int = 10) ->
     2) Supabase user id (participant identity)
     3) Room name fallback (`room-${user.id}` convention)
     """
-    loop = asyncio.get_running_loop()
-    deadline = loop.time() + max_wait_seconds
+    def resolve(p: rtc.RemoteParticipant) -> Optional[str]:
+        # Skip other agents.
+        if p.kind == rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
+            return None
 
-    while loop.time() < deadline:
-        for p in ctx.room.remote_participants.values():
-            # Skip other agents.
-            if p.kind == rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
-                continue
+        # Try to read Supabase JWT from participant metadata (set by /api/livekit-token).
+        user_token = _token_from_metadata(p.metadata or "")
 
-            # Try to read Supabase JWT from participant metadata (set by /api/livekit-token).
-            user_token = ""
-            try:
-                if p.metadata:
-                    data = json.loads(p.metadata)
-                    user_token = data.get("supabase_token") or ""
-            except Exception:
-                # Fallback if metadata is just the raw token string.
-                user_token = p.metadata or ""
+        if user_token:
+            # Decode email from JWT (same helper used by TetraAgent).
+            email = _email_from_jwt(user_token)
+            if email:
+                return email
+
+        # If we found the human user but couldn't decode an email, fall back to their ID.
+        return getattr(p, "identity", None) or None
 
-            if user_token:
-                # Decode email from JWT (same helper used by TetraAgent).
-                email = _email_from_jwt(user_token)
-                if email:
-                    return email
+    for p in ctx.room.remote_participants.values():
+        found = resolve(p)
+        if found:
+            return found
 
-            # If we found the human user but couldn't decode an email, fall back to their ID.
-            if getattr(p, "identity", None):
-                return p.identity
+    # Nobody usable yet: wait for the human to join instead of polling.
+    fut: asyncio.Future[str] = asyncio.get_running_loop().create_future()
 
-        await asyncio.sleep(0.2)
+    def on_participant_connected(p: rtc.RemoteParticipant) -> None:
+        found = resolve(p)
+        if found and not fut.done():
+            fut.set_result(found)
+
+    ctx.room.on("participant_connected", on_participant_connected)
+    try:
+        return await asyncio.wait_for(fut, timeout=max_wait_seconds)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        ctx.room.off("participant_connected", on_participant_connected)
 
     # Last-resort fallback: room name convention is `room-${user.id}`.
     rid = ctx.room.name or ""
@@ -1168,27 +1851,94 @@ async def _derive_arcade_user_id(ctx: JobContext, max_wait_seconds: int = 10) ->
     return rid
 
 
+# Strong references to in-flight warmups (asyncio only keeps weak ones); each removes itself
+# when done, so a warmup outlives the `entrypoint` call that started it without leaking.
+_warmup_tasks: set[asyncio.Task] = set()
+
+
+async def _warm_arcade_client(client: AsyncArcade) -> None:
+    """Issue a cheap request so DNS + TLS are done before the user's first Gmail tool call."""
+    try:
+        await client.tools.list(limit=1)
+    except Exception as e:
+        logger.warning(f"Arcade warmup request failed: {e}")
+
+
+def _token_from_metadata(metadata: str) -> str:
+    """
+    Return the Supabase JWT from LiveKit participant metadata.
+
+    The metadata is normally JSON (`{"supabase_token": ...}`) but may be the raw token string.
+    A JWT never starts with '{', so that check picks the branch without parsing.
+    """
+    if not metadata.startswith("{"):
+        return metadata
+    try:
+        data = json.loads(metadata)
+    except ValueError:
+        return metadata
+    return (data.get("supabase_token") or "") if isinstance(data, dict) else ""
+
+
+# Emails decoded from Supabase JWTs, keyed by a SHA-256 digest of the token so raw tokens
+# aren't kept in memory. Format: {digest: (expires_at_unix, email)}
+_jwt_email_cache: OrderedDict[bytes, tuple[float, Optional[str]]] = OrderedDict()
+_JWT_EMAIL_CACHE_SIZE = 64
+# Cache lifetime for tokens without an `exp` claim (seconds).
+_JWT_EMAIL_TTL = 60
+
+
 def _email_from_jwt(jwt_token: str) -> Optional[str]:
     """
     Extract the user's email from a Supabase JWT without verifying the signature.
 
     Used to match the Arcade user ID to the one used in the console OAuth flow.
+    Results are memoized until the token expires: a session presents the same token
+    over and over, so only the first lookup pays for the base64 + JSON decode.
     """
+    key = hashlib.sha256(jwt_token.encode()).digest()
+    now = time.time()
+    cached = _jwt_email_cache.get(key)
+    if cached is not None:
+        if cached[0] > now:
+            _jwt_email_cache.move_to_end(key)
+            return cached[1]
+        del _jwt_email_cache[key]
+
+    email: Optional[str] = None
+    expires_at = now + _JWT_EMAIL_TTL
     try:
-        parts = jwt_token.split(".")
-        if len(parts) < 2:
+        # header.payload.signature: slice out just the payload rather than splitting all three.
+        start = jwt_token.find(".") + 1
+        if not start:
             return None
-        payload_b64 = parts[1]
-        # base64url decode with padding
+        end = jwt_token.find(".", start)
+        payload_b64 = jwt_token[start:end] if end != -1 else jwt_token[start:]
+        # base64url decode with padding. Both steps take the data as-is (ASCII str in, bytes
+        # into json.loads), so there's no intermediate encode/decode.
         payload_b64 += "=" * (-len(payload_b64) % 4)
-        payload_json = base64.urlsafe_b64decode(
-            payload_b64.encode("utf-8")).decode("utf-8")
-        payload = json.loads(payload_json)
-        email = payload.get("email")
-        return email if isinstance(email, str) and email else None
+        payload = json.loads(base64.urlsafe_b64decode(payload_b64))
+        value = payload.get("email")
+        if isinstance(value, str) and value:
+            email = value
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = float(exp)
     except Exception:
         return None
 
+    _jwt_email_cache[key] = (expires_at, email)
+    while len(_jwt_email_cache) > _JWT_EMAIL_CACHE_SIZE:
+        _jwt_email_cache.popitem(last=False)
+    return email
+
+
+def _select_noise_cancellation(params):
+    """Telephony-tuned noise cancellation for SIP callers, the standard model for everyone else."""
+    if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP:
+        return noise_cancellation.BVCTelephony()
+    return noise_cancellation.BVC()
+
 
 @server.rtc_session(agent_name="Tetra")
 async def entrypoint(ctx: JobContext):
@@ -1216,6 +1966,13 @@ async def entrypoint(ctx: JobContext):
 
     logger.info("Starting session...")
 
+    # Warm the shared Arcade client while we wait for the room/participant.
+    arcade_client: Optional[AsyncArcade] = ctx.proc.userdata.get("arcade")
+    if arcade_client is not None:
+        warmup = asyncio.create_task(_warm_arcade_client(arcade_client))
+        _warmup_tasks.add(warmup)
+        warmup.add_done_callback(_warmup_tasks.discard)
+
     logger.info(f"Connecting to room {ctx.room.name}...")
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
     logger.info("Waiting for participant...")
@@ -1233,15 +1990,18 @@ async def entrypoint(ctx: JobContext):
     # 1. MCP has timing issues (CancelledError before tools list)
     # 2. The SDK approach is simpler and more reliable
     # 3. This is the same approach as read_gmail.py which works flawlessly
-    agent = TetraAgent(ctx.room, arcade_user_id=arcade_user_id)
+    agent = TetraAgent(
+        ctx.room,
+        arcade_user_id=arcade_user_id,
+        arcade_client=arcade_client,
+    )
 
     await session.start(
         agent=agent,
         room=ctx.room,
         room_options=room_io.RoomOptions(
             audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony(
-                ) if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP else noise_cancellation.BVC(),
+                noise_cancellation=_select_noise_cancellation,
             ),
         ),
     )
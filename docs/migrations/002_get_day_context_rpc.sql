@@ -0,0 +1,35 @@
+-- =============================================
+-- Migration: get_day_context RPC
+-- =============================================
+-- Run this in Supabase SQL Editor.
+--
+-- Returns a day's events and the user's open tasks in a single round trip,
+-- so the voice agent's `get_day_context` tool doesn't need two PostgREST calls.
+-- Runs as the caller (SECURITY INVOKER), so RLS still applies to user JWTs;
+-- the explicit owner filter keeps service-role (SIP) callers scoped too.
+
+CREATE OR REPLACE FUNCTION public.get_day_context(
+  p_user uuid,
+  p_start timestamptz,
+  p_end timestamptz
+)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT json_build_object(
+    'events', (
+      SELECT json_agg(e ORDER BY e.start)
+      FROM public.events e
+      WHERE e.owner = p_user
+        AND e.start >= p_start
+        AND e.start <= p_end
+    ),
+    'tasks', (
+      SELECT json_agg(t)
+      FROM public.tasks t
+      WHERE t.owner = p_user
+        AND t.done = false
+    )
+  );
+$$;
@@ -0,0 +1,35 @@
+-- =============================================
+-- Migration: reschedule_event RPC
+-- =============================================
+-- Run this in Supabase SQL Editor.
+--
+-- Moves and/or resizes an event in a single statement so the voice agent's
+-- `update_event` tool doesn't need to SELECT the row first:
+--   start = p_start (or the current start)
+--   end   = start + p_duration_min (or the current duration, or 60 minutes)
+-- Optional name/description changes are applied in the same UPDATE.
+-- Runs as the caller (SECURITY INVOKER), so RLS still applies.
+
+CREATE OR REPLACE FUNCTION public.reschedule_event(
+  p_id bigint,
+  p_start timestamptz DEFAULT NULL,
+  p_duration_min integer DEFAULT NULL,
+  p_name text DEFAULT NULL,
+  p_description text DEFAULT NULL
+)
+RETURNS SETOF public.events
+LANGUAGE sql
+AS $$
+  UPDATE public.events e
+  SET
+    start = COALESCE(p_start, e.start),
+    "end" = COALESCE(p_start, e.start) + COALESCE(
+      make_interval(mins => p_duration_min),
+      e."end" - e.start,
+      interval '60 minutes'
+    ),
+    name = COALESCE(p_name, e.name),
+    description = COALESCE(p_description, e.description)
+  WHERE e.id = p_id
+  RETURNING e.*;
+$$;
@@ -0,0 +1,32 @@
+-- =============================================
+-- Migration: Realtime change feed for events/tasks
+-- =============================================
+-- Run this in Supabase SQL Editor.
+--
+-- The console subscribes to `postgres_changes` on `events` and `tasks`
+-- (see frontend/app/console/ConsoleClient.tsx). Those messages are only
+-- emitted for tables in the `supabase_realtime` publication, so add them.
+-- Once added, every INSERT/UPDATE/DELETE -- whether from the voice agent or
+-- the console -- reaches the UI straight from Postgres as part of the same
+-- write, without a separate notification round trip. The agent's LiveKit
+-- `*_update` data messages remain as a fallback; the console dedupes by id.
+--
+-- DELETE payloads only include the primary key (default replica identity),
+-- which is all the console uses.
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_publication_tables
+    WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'events'
+  ) THEN
+    ALTER PUBLICATION supabase_realtime ADD TABLE public.events;
+  END IF;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_publication_tables
+    WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'tasks'
+  ) THEN
+    ALTER PUBLICATION supabase_realtime ADD TABLE public.tasks;
+  END IF;
+END $$;
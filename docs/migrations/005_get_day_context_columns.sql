@@ -0,0 +1,38 @@
+-- =============================================
+-- Migration: get_day_context RPC - minimal columns
+-- =============================================
+-- Run this in Supabase SQL Editor (after 002_get_day_context_rpc.sql).
+--
+-- Replaces get_day_context so it only returns the columns the voice agent
+-- renders (events: id, start, name; tasks: id, name, due) instead of whole
+-- rows. Descriptions, owner and timestamps are no longer serialized or sent.
+-- The event window is half-open: p_end is the next local midnight (exclusive).
+
+CREATE OR REPLACE FUNCTION public.get_day_context(
+  p_user uuid,
+  p_start timestamptz,
+  p_end timestamptz
+)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT json_build_object(
+    'events', (
+      SELECT json_agg(
+        json_build_object('id', e.id, 'start', e.start, 'name', e.name)
+        ORDER BY e.start
+      )
+      FROM public.events e
+      WHERE e.owner = p_user
+        AND e.start >= p_start
+        AND e.start < p_end
+    ),
+    'tasks', (
+      SELECT json_agg(json_build_object('id', t.id, 'name', t.name, 'due', t.due))
+      FROM public.tasks t
+      WHERE t.owner = p_user
+        AND t.done = false
+    )
+  );
+$$;
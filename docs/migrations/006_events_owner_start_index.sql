@@ -0,0 +1,11 @@
+-- =============================================
+-- Migration: events (owner, start) index
+-- =============================================
+-- Run this in Supabase SQL Editor.
+--
+-- get_day_context filters events by owner and a [p_start, p_end) range on
+-- start, ordered by start. This index turns that into a single range scan
+-- that also satisfies the ORDER BY.
+
+CREATE INDEX IF NOT EXISTS events_owner_start_idx
+  ON public.events (owner, start);
@@ -0,0 +1,55 @@
+-- =============================================
+-- Migration: book_event_if_free RPC
+-- =============================================
+-- Run this in Supabase SQL Editor.
+--
+-- Checks for overlapping events and inserts the new one in a single call,
+-- so the voice agent's `schedule_event` tool gets conflict detection without
+-- a separate availability query (and without a window between the check and
+-- the insert). Bookings are serialized per owner with a transaction-scoped
+-- advisory lock so two concurrent calls can't both see the slot as free.
+--
+-- Returns {"event": <row> | null, "conflicts": [<id,start,end,name>] | null}.
+-- With p_allow_overlap = true the conflict check is skipped.
+-- Runs as the caller (SECURITY INVOKER), so RLS still applies.
+
+CREATE OR REPLACE FUNCTION public.book_event_if_free(
+  p_owner uuid,
+  p_start timestamptz,
+  p_end timestamptz,
+  p_name text,
+  p_description text DEFAULT '',
+  p_allow_overlap boolean DEFAULT false
+)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_conflicts json;
+  v_event public.events;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext(p_owner::text));
+
+  IF NOT p_allow_overlap THEN
+    SELECT json_agg(
+      json_build_object('id', e.id, 'start', e.start, 'end', e."end", 'name', e.name)
+      ORDER BY e.start
+    )
+    INTO v_conflicts
+    FROM public.events e
+    WHERE e.owner = p_owner
+      AND e.start < p_end
+      AND e."end" > p_start;
+
+    IF v_conflicts IS NOT NULL THEN
+      RETURN json_build_object('event', NULL, 'conflicts', v_conflicts);
+    END IF;
+  END IF;
+
+  INSERT INTO public.events (owner, start, "end", name, description)
+  VALUES (p_owner, p_start, p_end, p_name, p_description)
+  RETURNING * INTO v_event;
+
+  RETURN json_build_object('event', row_to_json(v_event), 'conflicts', NULL);
+END;
+$$;
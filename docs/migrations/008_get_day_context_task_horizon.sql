@@ -0,0 +1,52 @@
+-- =============================================
+-- Migration: get_day_context RPC - task horizon
+-- =============================================
+-- Run this in Supabase SQL Editor (after 005_get_day_context_columns.sql).
+--
+-- Bounds the open tasks returned with a day's context: only undated tasks and
+-- tasks due before p_task_horizon (overdue ones included), soonest first,
+-- capped at 50. Keeps the payload and the LLM prompt from growing with the
+-- user's whole backlog.
+--
+-- The old 3-argument version is dropped so PostgREST has a single candidate.
+
+DROP FUNCTION IF EXISTS public.get_day_context(uuid, timestamptz, timestamptz);
+
+CREATE OR REPLACE FUNCTION public.get_day_context(
+  p_user uuid,
+  p_start timestamptz,
+  p_end timestamptz,
+  p_task_horizon timestamptz DEFAULT NULL
+)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT json_build_object(
+    'events', (
+      SELECT json_agg(
+        json_build_object('id', e.id, 'start', e.start, 'name', e.name)
+        ORDER BY e.start
+      )
+      FROM public.events e
+      WHERE e.owner = p_user
+        AND e.start >= p_start
+        AND e.start < p_end
+    ),
+    'tasks', (
+      SELECT json_agg(
+        json_build_object('id', t.id, 'name', t.name, 'due', t.due)
+        ORDER BY t.due ASC NULLS LAST
+      )
+      FROM (
+        SELECT t.id, t.name, t.due
+        FROM public.tasks t
+        WHERE t.owner = p_user
+          AND t.done = false
+          AND (t.due IS NULL OR p_task_horizon IS NULL OR t.due <= p_task_horizon)
+        ORDER BY t.due ASC NULLS LAST
+        LIMIT 50
+      ) t
+    )
+  );
+$$;
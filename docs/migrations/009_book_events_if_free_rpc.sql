@@ -0,0 +1,106 @@
+-- =============================================
+-- Migration: book_events_if_free RPC (batch booking)
+-- =============================================
+-- Run this in Supabase SQL Editor (after 007_book_event_if_free_rpc.sql).
+--
+-- Set-based counterpart of book_event_if_free for the voice agent's
+-- `schedule_events_batch` tool. Every draft is checked against the owner's
+-- existing events and against the other drafts in the batch (so a batch
+-- can't double-book itself where one-at-a-time schedule_event calls would
+-- have reported a conflict) and, only if nothing clashes, all are inserted.
+-- It takes the same per-owner advisory lock, so single and batch bookings
+-- can't race each other into a double booking.
+--
+-- p_events is a JSON array of {"start", "end", "name", "description"}.
+-- Returns {"events": [<row>] | null, "conflicts": [<conflict>] | null}. Each
+-- conflict has "index" (0-based position of the clashing draft in p_events)
+-- plus the start/end/name of what it clashes with: an existing event (with
+-- its "id") or an earlier draft of the same batch (with its "batch_index").
+-- With p_allow_overlap = true the conflict check is skipped.
+-- Runs as the caller (SECURITY INVOKER), so RLS still applies.
+--
+-- Example: two drafts that overlap each other (10:00-11:00 and 10:30-11:30)
+-- book nothing, even on an empty calendar:
+--
+--   SELECT public.book_events_if_free(
+--     auth.uid(),
+--     '[{"start": "2026-01-05T10:00:00Z", "end": "2026-01-05T11:00:00Z", "name": "Deep work"},
+--       {"start": "2026-01-05T10:30:00Z", "end": "2026-01-05T11:30:00Z", "name": "Gym"}]'
+--   );
+--   -- {"events": null, "conflicts": [{"index": 1, "batch_index": 0, "id": null,
+--   --   "start": "2026-01-05T10:00:00+00:00", "end": "2026-01-05T11:00:00+00:00",
+--   --   "name": "Deep work"}]}
+
+CREATE OR REPLACE FUNCTION public.book_events_if_free(
+  p_owner uuid,
+  p_events json,
+  p_allow_overlap boolean DEFAULT false
+)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_conflicts json;
+  v_events json;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext(p_owner::text));
+
+  IF NOT p_allow_overlap THEN
+    WITH drafts AS (
+      SELECT
+        d.idx - 1 AS idx,
+        (d.item->>'start')::timestamptz AS start,
+        (d.item->>'end')::timestamptz AS "end",
+        d.item->>'name' AS name
+      FROM json_array_elements(p_events) WITH ORDINALITY AS d(item, idx)
+    ),
+    clashes AS (
+      -- Drafts vs. the owner's existing events.
+      SELECT d.idx, NULL::bigint AS batch_index, e.id, e.start, e."end", e.name
+      FROM drafts d
+      JOIN public.events e
+        ON e.owner = p_owner
+       AND e.start < d."end"
+       AND e."end" > d.start
+      UNION ALL
+      -- Drafts vs. earlier drafts in the same batch (each pair reported once).
+      SELECT d2.idx, d1.idx, NULL, d1.start, d1."end", d1.name
+      FROM drafts d1
+      JOIN drafts d2
+        ON d1.idx < d2.idx
+       AND d1.start < d2."end"
+       AND d1."end" > d2.start
+    )
+    SELECT json_agg(
+      json_build_object(
+        'index', c.idx, 'batch_index', c.batch_index,
+        'id', c.id, 'start', c.start, 'end', c."end", 'name', c.name
+      )
+      ORDER BY c.idx, c.start
+    )
+    INTO v_conflicts
+    FROM clashes c;
+
+    IF v_conflicts IS NOT NULL THEN
+      RETURN json_build_object('events', NULL, 'conflicts', v_conflicts);
+    END IF;
+  END IF;
+
+  WITH inserted AS (
+    INSERT INTO public.events (owner, start, "end", name, description)
+    SELECT
+      p_owner,
+      (d.item->>'start')::timestamptz,
+      (d.item->>'end')::timestamptz,
+      d.item->>'name',
+      COALESCE(d.item->>'description', '')
+    FROM json_array_elements(p_events) AS d(item)
+    RETURNING *
+  )
+  SELECT json_agg(row_to_json(inserted) ORDER BY inserted.start)
+  INTO v_events
+  FROM inserted;
+
+  RETURN json_build_object('events', v_events, 'conflicts', NULL);
+END;
+$$;